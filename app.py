@@ -13,6 +13,13 @@ To run the app locally:
 Navigate to http://127.0.0.1:5000/ in your web browser.  Enter the
 relevant patient information and click "Submit" to see the recommended
 plan and rationale.
+
+`python3 app.py` uses Werkzeug's development server, which handles one
+request at a time.  For deployment, run it under gunicorn instead; the
+worker/thread settings live in `gunicorn.conf.py`:
+
+    pip install -r requirements.txt
+    gunicorn app:app
 """
 
 # -*- coding: utf-8 -*-
@@ -21,126 +28,129 @@ from esophageal_cancer_tool import recommend_plan
 
 app = Flask(__name__)
 
+# Templates only change on deploy: skip Jinja's per-render mtime check and
+# load the page template into the cache up front.
+app.config["TEMPLATES_AUTO_RELOAD"] = False
+app.jinja_env.auto_reload = False
+app.jinja_env.get_template("index.html")
+
+# Static grouped references shown below results.
+REFERENCES = {
+    "Definitive / Neoadjuvant Chemoradiation": [
+        ("RTOG 85-01", "https://pubmed.ncbi.nlm.nih.gov/10235156/"),
+        ("CROSS", "https://pubmed.ncbi.nlm.nih.gov/22646630/"),
+        ("PRODIGE5/ACCORD17", "https://pubmed.ncbi.nlm.nih.gov/24556041/"),
+    ],
+    "Peri-operative Chemotherapy (Resectable Adenocarcinoma)": [
+        ("MAGIC", "https://pubmed.ncbi.nlm.nih.gov/16822992/"),
+        ("FNCLCC ACCORD 07", "https://pubmed.ncbi.nlm.nih.gov/21444866/"),
+        ("FLOT4", "https://pubmed.ncbi.nlm.nih.gov/30982686/"),
+        ("NEO-AEGIS", "https://pubmed.ncbi.nlm.nih.gov/37318943/"),
+        ("ESOPEC", "https://pubmed.ncbi.nlm.nih.gov/38764613/"),
+        ("MATTERHORN", "https://pubmed.ncbi.nlm.nih.gov/39827347/"),
+    ],
+    "Adjuvant / Immunotherapy": [
+        ("CheckMate-577 (adjuvant nivolumab)", "https://pubmed.ncbi.nlm.nih.gov/33843945/"),
+        ("CheckMate-649", "https://pubmed.ncbi.nlm.nih.gov/34102137/"),
+        ("KEYNOTE-811", "https://pubmed.ncbi.nlm.nih.gov/34912120/"),
+    ],
+    "Guidelines": [
+        ("NCCN Guidelines v4.2025 (login required)", "https://www.nccn.org/guidelines/category_1"),
+    ],
+}
+
+
+# The fragment is identical for every visitor, so it is rendered once here and
+# served from its own long-cached route instead of inside each result page.
+with app.app_context():
+    REFERENCES_HTML = render_template("_references.html", references=REFERENCES)
+
+
+# Checkbox form fields mapped to the coded values expected by
+# recommend_plan, in display order.
+COMORBIDITY_FIELDS = (
+    ("comorb_severe_pulm", "severe_pulm"),  # COPD / significant lung disease
+    ("comorb_severe_card", "severe_card"),  # CAD / HF
+    ("comorb_frailty", "frailty"),
+    ("comorb_ckd", "ckd"),
+    ("comorb_liver", "liver"),
+    ("comorb_prior_rt", "prior_rt"),
+    ("comorb_autoimmune", "autoimmune"),
+    ("comorb_diabetes", "diabetes"),
+    ("comorb_malnutrition", "malnutrition"),
+)
+
+INVASION_FIELDS = (
+    ("inv_none", "none_beyond_wall"),
+    ("inv_adventitial", "adventitial_involvement"),
+    ("inv_airway", "airway_invasion"),
+    ("inv_aorta", "aortic_encasement"),
+    ("inv_vertebral", "vertebral_body_involvement"),
+    ("inv_diaphragm", "diaphragm_involvement"),
+    ("inv_pericardium", "pericardial_involvement"),
+    ("inv_pleural", "pleural_carcinomatosis"),
+)
+
+NODAL_FIELDS = (
+    ("node_mediastinal", "mediastinal"),
+    ("node_celiac", "celiac"),
+    ("node_supraclavicular", "supraclavicular"),
+    ("node_retroperitoneal", "retroperitoneal"),
+)
+
+MET_FIELDS = (
+    ("met_liver", "liver"),
+    ("met_lung", "lung"),
+    ("met_bone", "bone"),
+    ("met_brain", "brain"),
+    ("met_peritoneal", "peritoneal"),
+    ("met_distant_nodes", "distant_nodes"),
+)
+
+
+def _checked_codes(form, fields):
+    """Return the coded values of the ticked checkboxes in ``fields``."""
+    return [code for name, code in fields if form.get(name)]
+
 
 @app.route("/", methods=["GET", "POST"])
 def index():
     result = None
 
-    # Static grouped references shown below results
-    references = {
-        "Definitive / Neoadjuvant Chemoradiation": [
-            ("RTOG 85-01", "https://pubmed.ncbi.nlm.nih.gov/10235156/"),
-            ("CROSS", "https://pubmed.ncbi.nlm.nih.gov/22646630/"),
-            ("PRODIGE5/ACCORD17", "https://pubmed.ncbi.nlm.nih.gov/24556041/"),
-        ],
-        "Peri-operative Chemotherapy (Resectable Adenocarcinoma)": [
-            ("MAGIC", "https://pubmed.ncbi.nlm.nih.gov/16822992/"),
-            ("FNCLCC ACCORD 07", "https://pubmed.ncbi.nlm.nih.gov/21444866/"),
-            ("FLOT4", "https://pubmed.ncbi.nlm.nih.gov/30982686/"),
-            ("NEO-AEGIS", "https://pubmed.ncbi.nlm.nih.gov/37318943/"),
-            ("ESOPEC", "https://pubmed.ncbi.nlm.nih.gov/38764613/"),
-            ("MATTERHORN", "https://pubmed.ncbi.nlm.nih.gov/39827347/"),
-        ],
-        "Adjuvant / Immunotherapy": [
-            ("CheckMate-577 (adjuvant nivolumab)", "https://pubmed.ncbi.nlm.nih.gov/33843945/"),
-            ("CheckMate-649", "https://pubmed.ncbi.nlm.nih.gov/34102137/"),
-            ("KEYNOTE-811", "https://pubmed.ncbi.nlm.nih.gov/34912120/"),
-        ],
-        "Guidelines": [
-            ("NCCN Guidelines v4.2025 (login required)", "https://www.nccn.org/guidelines/category_1"),
-        ],
-    }
-
     if request.method == "POST":
+        form = request.form
+
         # Basic clinical fields
-        age_raw = request.form.get("age", "").strip()
-        stage = request.form.get("stage", "").strip()
-        histology = request.form.get("histology", "adenocarcinoma").strip()
+        age_raw = form.get("age", "").strip()
+        stage = form.get("stage", "").strip()
+        histology = form.get("histology", "adenocarcinoma").strip()
 
-        size_raw = request.form.get("tumour_size_cm", "").strip()
-        grade = request.form.get("grade", "").strip()
-        lvi = request.form.get("lvi", "no")
+        size_raw = form.get("tumour_size_cm", "").strip()
+        grade = form.get("grade", "").strip()
+        lvi = form.get("lvi", "no")
 
         # Biomarkers
-        her2 = request.form.get("her2", "negative")
-        pdl1_raw = request.form.get("pdl1", "").strip()
-        msi = request.form.get("msi", "negative")
-        cldn = request.form.get("cldn", "negative")
+        her2 = form.get("her2", "negative")
+        pdl1_raw = form.get("pdl1", "").strip()
+        msi = form.get("msi", "negative")
+        cldn = form.get("cldn", "negative")
 
         # Comorbidities (checkboxes)
-        comorbidities = []
-        if request.form.get("comorb_severe_pulm"):  # COPD / significant lung disease
-            comorbidities.append("severe_pulm")
-        if request.form.get("comorb_severe_card"):  # CAD / HF
-            comorbidities.append("severe_card")
-        if request.form.get("comorb_frailty"):
-            comorbidities.append("frailty")
-        if request.form.get("comorb_ckd"):
-            comorbidities.append("ckd")
-        if request.form.get("comorb_liver"):
-            comorbidities.append("liver")
-        if request.form.get("comorb_prior_rt"):
-            comorbidities.append("prior_rt")
-        if request.form.get("comorb_autoimmune"):
-            comorbidities.append("autoimmune")
-        if request.form.get("comorb_diabetes"):
-            comorbidities.append("diabetes")
-        if request.form.get("comorb_malnutrition"):
-            comorbidities.append("malnutrition")
-
-        comorbidities_other = request.form.get("comorbidities_other", "").strip()
+        comorbidities = _checked_codes(form, COMORBIDITY_FIELDS)
+        comorbidities_other = form.get("comorbidities_other", "").strip()
 
         # Imaging — Option B structure
-        tumour_location = request.form.get("tumour_location", "").strip()
-
-        invasion_features = []
-        if request.form.get("inv_none"):
-            invasion_features.append("none_beyond_wall")
-        if request.form.get("inv_adventitial"):
-            invasion_features.append("adventitial_involvement")
-        if request.form.get("inv_airway"):
-            invasion_features.append("airway_invasion")
-        if request.form.get("inv_aorta"):
-            invasion_features.append("aortic_encasement")
-        if request.form.get("inv_vertebral"):
-            invasion_features.append("vertebral_body_involvement")
-        if request.form.get("inv_diaphragm"):
-            invasion_features.append("diaphragm_involvement")
-        if request.form.get("inv_pericardium"):
-            invasion_features.append("pericardial_involvement")
-        if request.form.get("inv_pleural"):
-            invasion_features.append("pleural_carcinomatosis")
-
-        nodal_regions = []
-        if request.form.get("node_mediastinal"):
-            nodal_regions.append("mediastinal")
-        if request.form.get("node_celiac"):
-            nodal_regions.append("celiac")
-        if request.form.get("node_supraclavicular"):
-            nodal_regions.append("supraclavicular")
-        if request.form.get("node_retroperitoneal"):
-            nodal_regions.append("retroperitoneal")
-
-        distant_met_sites = []
-        if request.form.get("met_liver"):
-            distant_met_sites.append("liver")
-        if request.form.get("met_lung"):
-            distant_met_sites.append("lung")
-        if request.form.get("met_bone"):
-            distant_met_sites.append("bone")
-        if request.form.get("met_brain"):
-            distant_met_sites.append("brain")
-        if request.form.get("met_peritoneal"):
-            distant_met_sites.append("peritoneal")
-        if request.form.get("met_distant_nodes"):
-            distant_met_sites.append("distant_nodes")
-        met_other = request.form.get("met_other", "").strip()
+        tumour_location = form.get("tumour_location", "").strip()
+        invasion_features = _checked_codes(form, INVASION_FIELDS)
+        nodal_regions = _checked_codes(form, NODAL_FIELDS)
+        distant_met_sites = _checked_codes(form, MET_FIELDS)
+        met_other = form.get("met_other", "").strip()
         if met_other:
             distant_met_sites.append("other")
 
-        imaging_other = request.form.get("imaging_findings", "").strip()
+        imaging_other = form.get("imaging_findings", "").strip()
 
-        surgical_candidate = request.form.get("surgical_candidate", "yes") == "yes"
+        surgical_candidate = form.get("surgical_candidate", "yes") == "yes"
 
         # Convert numeric fields safely
         age = int(age_raw) if age_raw.isdigit() else None
@@ -157,7 +167,7 @@ def index():
             "HER2": (her2 == "positive"),
             "PD_L1_CPS": pdl1_cps,
             "MSI": (msi == "positive"),
-            "CLDN18.2": (cldn == "positive"),
+            "CLDN18_2": (cldn == "positive"),
         }
 
         patient = {
@@ -184,9 +194,17 @@ def index():
             "details": rp.get("details", ""),
         }
 
-    return render_template("index.html", result=result, references=references)
+    return render_template("index.html", result=result)
+
+
+@app.route("/references")
+def references():
+    response = app.response_class(REFERENCES_HTML, mimetype="text/html")
+    response.headers["Cache-Control"] = "public, max-age=86400"
+    return response
 
 
 if __name__ == "__main__":
+    # Development server only; see gunicorn.conf.py for production.
     # If 5000 is occupied (macOS AirPlay), change port to e.g. 5050
     app.run(host="0.0.0.0", port=5000, debug=False)
\ No newline at end of file
@@ -23,66 +23,615 @@ Key trials:
 - NCCN Guidelines (login required): https://www.nccn.org/guidelines/category_1
 """
 
-from dataclasses import dataclass, field
-from typing import Dict, List, Optional, Tuple, Any
+from typing import Any, Callable, Dict, FrozenSet, List, Mapping, NamedTuple, Optional, Tuple, Union
+import collections.abc
+import io
+import operator
+import os
 import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from enum import IntEnum
+from functools import lru_cache, reduce
+from itertools import product
 
 
 # -------------------------------------------------------------------
 # Data structure
 # -------------------------------------------------------------------
 
-@dataclass
-class PatientData:
-    age: int
-    stage: str
-    histology: str  # "adenocarcinoma" or "squamous"
-
-    # Pathologic / clinical features
-    tumour_size_cm: Optional[float] = None
-    grade: Optional[str] = None
-    lymphovascular_invasion: Optional[bool] = None
+class Location(IntEnum):
+    OTHER = 0
+    CERVICAL = 1
+    UPPER_THORACIC = 2
+    MID_THORACIC = 3
+    DISTAL_THORACIC = 4
+    GEJ_SIEWERT1 = 5
+    GEJ_SIEWERT2 = 6
+    GEJ_SIEWERT3 = 7
+
+
+class Histology(IntEnum):
+    OTHER = 0
+    ADENOCARCINOMA = 1
+    SQUAMOUS = 2
+
+
+class TClass(IntEnum):
+    """T categories grouped the way the local/regional rules test them."""
+    OTHER = 0
+    EARLY = 1             # Tis/T1a
+    T1B_T2 = 2
+    LOCALLY_ADVANCED = 3  # T3/T4a
+
+
+# Form codes for tumour location and histology
+_LOCATIONS = {
+    "cervical": Location.CERVICAL,
+    "upper_thoracic": Location.UPPER_THORACIC,
+    "mid_thoracic": Location.MID_THORACIC,
+    "distal_thoracic": Location.DISTAL_THORACIC,
+    "gej_siewert1": Location.GEJ_SIEWERT1,
+    "gej_siewert2": Location.GEJ_SIEWERT2,
+    "gej_siewert3": Location.GEJ_SIEWERT3,
+}
+_HISTOLOGIES = {
+    "adenocarcinoma": Histology.ADENOCARCINOMA,
+    "squamous": Histology.SQUAMOUS,
+}
+
+
+def _t_class(t: str) -> TClass:
+    # The groups are disjoint, so test them in order of how often they are
+    # seen: most esophageal cancers present locally advanced, early
+    # (Tis/T1a) disease is the rarest.
+    if "T3" in t or "T4A" in t:
+        return TClass.LOCALLY_ADVANCED
+    if t in {"T1B", "T2"}:
+        return TClass.T1B_T2
+    if t in {"TIS", "T1A"}:
+        return TClass.EARLY
+    return TClass.OTHER
+
+
+# Canonical biomarker keys.  Other spellings (lower-case, or "CLDN18.2")
+# are mapped onto these once when PatientData is built.
+_BIOMARKER_FIELDS: Tuple[str, ...] = ("HER2", "PD_L1_CPS", "MSI", "CLDN18_2")
+_BIOMARKER_KEYS: FrozenSet[str] = frozenset(_BIOMARKER_FIELDS)
+
+
+def _canonical_biomarkers(biomarkers: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Return ``biomarkers`` keyed canonically (as-is when already canonical)."""
+    if not biomarkers:
+        return {}
+    if _BIOMARKER_KEYS.issuperset(biomarkers):
+        return biomarkers
+    return {k.upper().replace(".", "_"): v for k, v in biomarkers.items()}
 
-    # Biomarkers
-    biomarkers: Dict[str, Optional[float]] = field(default_factory=dict)
 
-    # Comorbidities (coded)
-    # e.g. ["severe_pulm", "severe_card", "frailty", "ckd", "liver", "prior_rt", "autoimmune", "diabetes", "malnutrition"]
-    comorbidities: List[str] = field(default_factory=list)
-    comorbidities_other: str = ""
+class PatientData:
+    """Normalized patient inputs for :func:`recommend_plan`.
+
+    A plain slotted class rather than a dataclass: one instance is built per
+    cache miss, so skipping the per-instance ``__dict__`` keeps it cheap, and
+    ``@dataclass(slots=True)`` would need Python 3.10.  Build instances with
+    :meth:`from_dict`, or with :meth:`from_key` when a :func:`_cache_key`
+    tuple is already at hand.  Normalization happens once, in the key;
+    derivation then parses the stage, packs the coded invasion and
+    comorbidity codes into bitmasks and maps location and histology onto
+    enums.  Only what the rules go on to read is kept; the raw coded lists,
+    age, nodal regions and free text are dropped.
+    """
 
-    # Imaging structure (Option B)
-    tumour_location: str = ""  # "cervical", "upper_thoracic", "mid_thoracic", "distal_thoracic", "gej_siewert1/2/3"
-    invasion_features: List[str] = field(default_factory=list)
-    # e.g. ["none_beyond_wall", "adventitial_involvement", "airway_invasion",
-    #       "aortic_encasement", "vertebral_body_involvement",
-    #       "diaphragm_involvement", "pericardial_involvement",
-    #       "pleural_carcinomatosis"]
-    nodal_regions: List[str] = field(default_factory=list)  # ["mediastinal","celiac","supraclavicular","retroperitoneal"]
-    distant_met_sites: List[str] = field(default_factory=list)  # ["liver","lung","bone","brain","peritoneal","distant_nodes","other"]
-    imaging_findings: str = ""
+    __slots__ = (
+        "stage",
+        "histology",
+        "tumour_size_cm",
+        "grade",
+        "lymphovascular_invasion",
+        "biomarkers",
+        "surgical_candidate",
+        "imaging_met_sites",
+        "T",
+        "N",
+        "M",
+        "is_metastatic",
+        "loc",
+        "hist",
+        "t_class",
+        "invasion_mask",
+        "comorbidity_mask",
+    )
 
-    surgical_candidate: bool = True
+    def __init__(
+        self,
+        *,
+        stage: str,  # as entered (for rationale text)
+        histology: str,  # as entered (for rationale text)
+        # Pathologic / clinical features
+        tumour_size_cm: Optional[float],
+        grade: Optional[str],
+        lymphovascular_invasion: Optional[bool],
+        # Biomarker values in _BIOMARKER_FIELDS order (HER2, PD_L1_CPS, MSI, CLDN18_2)
+        biomarkers: Tuple[Any, ...],
+        surgical_candidate: bool,
+        # Derived in from_key
+        imaging_met_sites: Tuple[str, ...],  # distant sites incl. carcinomatosis; empty if none
+        T: str,  # parsed TNM, interned for the comparisons in the rule cascade
+        N: str,
+        M: str,
+        is_metastatic: bool,  # by TNM or by imaging
+        loc: Location,
+        hist: Histology,
+        t_class: TClass,
+        invasion_mask: int,  # coded flags packed into bitmasks (see _FLAG_BITS)
+        comorbidity_mask: int,
+    ) -> None:
+        self.stage = stage
+        self.histology = histology
+        self.tumour_size_cm = tumour_size_cm
+        self.grade = grade
+        self.lymphovascular_invasion = lymphovascular_invasion
+        self.biomarkers = biomarkers
+        self.surgical_candidate = surgical_candidate
+        self.imaging_met_sites = imaging_met_sites
+        self.T = T
+        self.N = N
+        self.M = M
+        self.is_metastatic = is_metastatic
+        self.loc = loc
+        self.hist = hist
+        self.t_class = t_class
+        self.invasion_mask = invasion_mask
+        self.comorbidity_mask = comorbidity_mask
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> "PatientData":
+        """Normalize a patient dict (see :func:`recommend_plan` for keys)."""
+        return cls.from_key(_cache_key(data))
+
+    @classmethod
+    def from_key(cls, key: Tuple) -> "PatientData":
+        """Derive from a :func:`_cache_key` tuple, which is already normalized."""
+        (stage, histology, tumour_size_cm, grade, lvi, biomarkers,
+         comorbidity_mask, tumour_location, invasion_mask,
+         distant_met_sites, surgical_candidate) = key
+
+        # Distant metastases seen on imaging, either coded directly or via
+        # invasion features that represent carcinomatosis/implants.  NCCN
+        # defines pleural or peritoneal implants as distant metastases rather
+        # than local invasion (eg, pleural carcinomatosis corresponds to M1
+        # disease【944136750254746†L3550-L3577】).
+        sites = distant_met_sites
+        if invasion_mask & _MET_INVASION_MASK:
+            sites = list(sites)
+            for f, site in _MET_INVASION_SITES:
+                if invasion_mask & _FLAG_BITS[f] and site not in sites:
+                    sites.append(site)
+            sites = tuple(sites)
+
+        T, N, M = parse_stage(stage)
+        T = sys.intern(T)
+
+        return cls(
+            stage=stage,
+            histology=histology,
+            tumour_size_cm=tumour_size_cm,
+            grade=grade,
+            lymphovascular_invasion=lvi,
+            biomarkers=biomarkers,
+            surgical_candidate=surgical_candidate,
+            imaging_met_sites=sites,
+            T=T,
+            N=sys.intern(N),
+            M=sys.intern(M),
+            is_metastatic=(bool(M) and M != "M0") or bool(sites),
+            loc=_LOCATIONS.get(tumour_location, Location.OTHER),
+            hist=_HISTOLOGIES.get((histology or "").lower(), Histology.OTHER),
+            t_class=_t_class(T),
+            invasion_mask=invasion_mask,
+            comorbidity_mask=comorbidity_mask,
+        )
 
 
 # -------------------------------------------------------------------
 # TNM parser
 # -------------------------------------------------------------------
 
+# One alternation scanned once; the named group tells T, N or M apart.
+_TNM_RE = re.compile(r"(?P<T>T(?:IS|\d+[AB]?))|(?P<N>N\d+[AB]?)|(?P<M>M\d+[AB]?)")
+_TNM_INDEX = {"T": 0, "N": 1, "M": 2}
+
+
+def _scan_stage(s: str) -> Tuple[str, str, str]:
+    """Regex scan of an upper-cased stage string.
+
+    The first occurrence of each component wins, as with three separate
+    searches.
+    """
+    tnm = ["", "", ""]
+    for m in _TNM_RE.finditer(s):
+        i = _TNM_INDEX[m.lastgroup]
+        if not tnm[i]:
+            tnm[i] = m.group()
+    return (tnm[0], tnm[1], tnm[2])
+
+
+def _build_stage_lut() -> Dict[str, Tuple[str, str, str]]:
+    # Every AJCC-style combination the form is likely to see, written both
+    # compactly ("CT3N1M0") and space-separated ("CT3 N1 M0").  Values come
+    # from the regex itself, so a hit is always identical to a scan.
+    lut = {}
+    for prefix in ("", "C", "P", "YP"):
+        for t in ("TIS", "T0", "T1", "T1A", "T1B", "T2", "T3", "T4", "T4A", "T4B"):
+            for n in ("", "N0", "N1", "N2", "N3"):
+                for m in ("", "M0", "M1"):
+                    parts = [prefix + t] + [x for x in (n, m) if x]
+                    for key in ("".join(parts), " ".join(parts)):
+                        lut[key] = _scan_stage(key)
+    return lut
+
+
+_STAGE_LUT = _build_stage_lut()
+
+
 def parse_stage(stage: str) -> Tuple[str, str, str]:
-    """Parse TNM stage string into (T, N, M)."""
+    """Parse TNM stage string into (T, N, M).
+
+    Common stage strings are answered from a precomputed table; anything
+    else falls back to a regex scan.
+    """
     s = stage.upper() if stage else ""
-    T = re.search(r"T\d+[AB]?", s)
-    N = re.search(r"N\d+[AB]?", s)
-    M = re.search(r"M\d+[AB]?", s)
-    return (T.group(0) if T else "", N.group(0) if N else "", M.group(0) if M else "")
+    hit = _STAGE_LUT.get(s)
+    return hit if hit is not None else _scan_stage(s)
+
+
+# -------------------------------------------------------------------
+# Coded feature groups
+# -------------------------------------------------------------------
+
+# Features that correspond to T4b (unresectable) disease.  NCCN defines
+# invasion of the trachea/airway, aorta, or vertebral body as T4b.
+# Pericardial involvement is classified as T4a and is potentially
+# resectable; pleural or peritoneal carcinomatosis are distant
+# metastases (M1) rather than local invasion【944136750254746†L3550-L3577】.
+_T4B_LIKE: FrozenSet[str] = frozenset({
+    "airway_invasion",
+    "aortic_encasement",
+    "vertebral_body_involvement",
+})
+
+# Invasion features that represent carcinomatosis/implants (M1 disease),
+# with the metastatic site each one is reported as
+_MET_INVASION_SITES = (
+    ("pleural_carcinomatosis", "pleura"),
+    ("peritoneal_carcinomatosis", "peritoneal"),
+)
+_MET_INVASION: FrozenSet[str] = frozenset(f for f, _ in _MET_INVASION_SITES)
+
+# Comorbidity codes that make esophagectomy high risk
+_HIGH_RISK_COMORB: FrozenSet[str] = frozenset({
+    "severe_pulm", "severe_card", "frailty", "ckd", "liver",
+})
+
+# Tumour locations at the esophagogastric junction (Siewert I-III)
+_GEJ_LOCATIONS: FrozenSet[Location] = frozenset({
+    Location.GEJ_SIEWERT1, Location.GEJ_SIEWERT2, Location.GEJ_SIEWERT3,
+})
+
+# Every known invasion/comorbidity code gets one bit so each rule gate above
+# becomes a single integer AND against the patient's packed flags.
+_FLAG_BITS: Dict[str, int] = {
+    code: 1 << i
+    for i, code in enumerate((
+        "none_beyond_wall", "adventitial_involvement", "airway_invasion",
+        "aortic_encasement", "vertebral_body_involvement",
+        "diaphragm_involvement", "pericardial_involvement",
+        "pleural_carcinomatosis", "peritoneal_carcinomatosis",
+        "severe_pulm", "severe_card", "frailty", "ckd", "liver",
+        "prior_rt", "autoimmune", "diabetes", "malnutrition",
+    ))
+}
+
+
+def _flag_mask(codes) -> int:
+    """Pack coded strings into a bitmask; unknown codes are ignored."""
+    if not codes:
+        return 0
+    bits = _FLAG_BITS
+    return reduce(operator.or_, (bits[c] for c in codes if c in bits), 0)
+
+
+_T4B_MASK = _flag_mask(_T4B_LIKE)
+_MET_INVASION_MASK = _flag_mask(_MET_INVASION)
+_HIGH_RISK_MASK = _flag_mask(_HIGH_RISK_COMORB)
+
+
+# -------------------------------------------------------------------
+# Systemic therapy (metastatic disease)
+# -------------------------------------------------------------------
+
+# MSI-H/dMMR tumours: ICI monotherapy has regulatory approval and
+# supersedes other biomarker-directed therapies in first line
+_MSI_OPTION = (
+    "immune checkpoint inhibitor monotherapy (e.g., pembrolizumab "
+    "or dostarlimab) for MSI-H/dMMR disease"
+)
+
+# If no biomarker-driven options were generated, use standard chemo ± immunotherapy
+_DEFAULT_SYSTEMIC_OPTION = (
+    "fluoropyrimidine + platinum chemotherapy (e.g., FOLFOX or CAPOX) with or "
+    "without immunotherapy based on PD-L1 and histology"
+)
+
+# PD-L1 CPS tiers per histology: (threshold, option at/above, option below).
+# Squamous per CheckMate 648; adenocarcinoma/GEJ per CheckMate 649 / KEYNOTE‑590.
+_PD_L1_TIERS = {
+    Histology.SQUAMOUS: (
+        10,
+        "platinum-based chemotherapy + nivolumab, or "
+        "nivolumab/ipilimumab in selected patients",
+        "platinum-based chemotherapy ± nivolumab, depending on PD-L1 expression and prior therapy",
+    ),
+    Histology.ADENOCARCINOMA: (
+        5,
+        "fluoropyrimidine + platinum chemotherapy + nivolumab or pembrolizumab",
+        "fluoropyrimidine + platinum chemotherapy with optional immunotherapy depending on local practice",
+    ),
+}
+
+
+def _her2_rule(bmk: Dict[str, Any], hist: Histology, pd_l1: Optional[float]) -> Optional[str]:
+    # HER2-positive disease: standard is fluoropyrimidine + platinum + trastuzumab
+    if not bmk.get("HER2"):
+        return None
+    option = "fluoropyrimidine + platinum chemotherapy + trastuzumab"
+    # if PD-L1 CPS ≥5 in adenocarcinoma, immunotherapy may be added
+    if pd_l1 is not None and hist == Histology.ADENOCARCINOMA and pd_l1 >= 5:
+        option += " ± nivolumab or pembrolizumab"
+    return option
+
+
+def _cldn_rule(bmk: Dict[str, Any], hist: Histology, pd_l1: Optional[float]) -> Optional[str]:
+    # CLDN18.2-positive disease only if HER2-negative
+    if bmk.get("CLDN18_2") and not bmk.get("HER2"):
+        return "FOLFOX or CAPOX + zolbetuximab for CLDN18.2-positive disease"
+    return None
+
+
+def _pd_l1_rule(bmk: Dict[str, Any], hist: Histology, pd_l1: Optional[float]) -> Optional[str]:
+    # For adenocarcinoma, only consider this pathway if the tumour is not
+    # HER2-positive or CLDN18.2-positive, because targeted agents take
+    # precedence.  When HER2-positive and PD-L1 ≥5, the addition of
+    # nivolumab/pembrolizumab is already handled with trastuzumab.
+    tier = _PD_L1_TIERS.get(hist)
+    if tier is None or pd_l1 is None:
+        return None
+    if hist == Histology.ADENOCARCINOMA and (bmk.get("HER2") or bmk.get("CLDN18_2")):
+        return None
+    threshold, high, low = tier
+    return high if pd_l1 >= threshold else low
+
+
+# Evaluated in order; every rule that yields an option contributes one.
+_SYSTEMIC_RULES = (_her2_rule, _cldn_rule, _pd_l1_rule)
+
+
+def systemic_therapy_options(pdata: PatientData) -> List[str]:
+    """First-line systemic therapy options for metastatic disease.
+
+    Priority is given to MSI-H/dMMR monotherapy, followed by HER2-targeted
+    therapy, CLDN18.2-targeted therapy (when HER2 is negative), and
+    immunotherapy combinations based on PD-L1 expression and histology.
+    """
+    bmk = dict(zip(_BIOMARKER_FIELDS, pdata.biomarkers))
+    hist = pdata.hist
+    if bmk.get("MSI"):
+        return [_MSI_OPTION]
+    pd_l1 = bmk.get("PD_L1_CPS")
+    options = []
+    for rule in _SYSTEMIC_RULES:
+        option = rule(bmk, hist, pd_l1)
+        if option is not None:
+            options.append(option)
+    return options or [_DEFAULT_SYSTEMIC_OPTION]
+
+
+# -------------------------------------------------------------------
+# Local/regional decision rules
+# -------------------------------------------------------------------
+
+class _Context(NamedTuple):
+    """Per-patient facts the local/regional rules are evaluated against."""
+    t: str           # parsed T category, upper-case (for rationale text)
+    t_class: TClass
+    stage: str       # stage string as entered (for rationale text)
+    histology: str   # histology as entered (for rationale text)
+    n0: bool
+    unresectable: bool
+    high_risk_surgery: bool
+    cervical: bool
+    t4b_invasion: bool
+    low_risk: bool   # T1b/T2 N0 without size/grade/LVI high-risk features
+    gej_adeno: bool  # GEJ (Siewert) adenocarcinoma
+
+
+class _Rule(NamedTuple):
+    cond: Callable[[_Context], bool]
+    summary: Optional[str]
+    details: Tuple[str, ...]  # format templates; ``{c}`` is the _Context
+
+
+def _is_low_risk(pdata: PatientData) -> bool:
+    # High-risk features prompting neoadjuvant therapy
+    if pdata.tumour_size_cm and pdata.tumour_size_cm >= 3:
+        return False
+    if pdata.grade and pdata.grade.lower().startswith("poor"):
+        return False
+    if pdata.lymphovascular_invasion:
+        return False
+    return True
+
+
+def _operable(c: _Context) -> bool:
+    return not c.unresectable and not c.high_risk_surgery
+
+
+def _t1b_t2_n0(c: _Context) -> bool:
+    return _operable(c) and c.t_class == TClass.T1B_T2 and c.n0
+
+
+def _locally_advanced(c: _Context) -> bool:
+    return _operable(c) and (c.t_class == TClass.LOCALLY_ADVANCED or not c.n0)
+
+
+_LOCALLY_ADVANCED_DETAIL = (
+    "Locally advanced stage {c.stage} is typically managed with "
+    "neoadjuvant therapy followed by esophagectomy. Approaches "
+    "include chemoradiation (CROSS-type) or peri-operative "
+    "chemotherapy (e.g., FLOT) depending on histology and location."
+)
+
+# Evaluated in order; every matching rule contributes its summary and
+# rationale lines.  Mirrors the NCCN pathway for non-metastatic disease.
+# Compiled into _LOCOREGIONAL_TABLE at import rather than walked per call.
+_LOCOREGIONAL_RULES = (
+    # Early disease: Tis/T1a
+    _Rule(
+        lambda c: _operable(c) and c.t_class == TClass.EARLY,
+        "Endoscopic resection (EMR/ESD)",
+        (
+            "Stage {c.t} disease is confined to the mucosa. "
+            "Endoscopic therapy (EMR/ESD) is preferred for high-grade "
+            "dysplasia and T1a lesions when the lesion is small and "
+            "without high-risk features.",
+            "If the lesion is extensive or not amenable to endoscopic "
+            "removal, esophagectomy is recommended.",
+        ),
+    ),
+    # T1b or T2 N0: surgery vs neoadjuvant
+    _Rule(
+        lambda c: _t1b_t2_n0(c) and c.low_risk,
+        "Primary esophagectomy",
+        (
+            "For a small (<3 cm), well-differentiated {c.histology} "
+            "tumour without lymphovascular invasion (pT1b–pT2,N0), "
+            "esophagectomy alone is an NCCN-accepted option.",
+        ),
+    ),
+    _Rule(
+        lambda c: _t1b_t2_n0(c) and not c.low_risk,
+        "Neoadjuvant chemoradiation → esophagectomy",
+        (
+            "Because the tumour has high-risk features (size ≥3 cm, "
+            "poor differentiation and/or lymphovascular invasion), "
+            "neoadjuvant chemoradiation followed by esophagectomy is "
+            "preferred.",
+        ),
+    ),
+    # Locally advanced resectable disease (T3/T4a or N+); for GEJ Siewert
+    # adenocarcinoma, peri-operative chemotherapy (FLOT) is preferred
+    _Rule(
+        lambda c: _locally_advanced(c) and c.gej_adeno,
+        "Peri-operative chemotherapy (FLOT) → esophagectomy",
+        (_LOCALLY_ADVANCED_DETAIL,),
+    ),
+    _Rule(
+        lambda c: _locally_advanced(c) and not c.gej_adeno,
+        "Neoadjuvant chemoradiation → esophagectomy",
+        (_LOCALLY_ADVANCED_DETAIL,),
+    ),
+    # Adjuvant therapy after resection (conceptual guidance text); applies
+    # whenever one of the esophagectomy pathways above was recommended
+    _Rule(
+        lambda c: _t1b_t2_n0(c) or _locally_advanced(c),
+        None,
+        (
+            "After surgery, pathologic staging determines the need for "
+            "adjuvant therapy. Residual disease (ypT+ and/or ypN+) after "
+            "neoadjuvant chemoradiation and R0 resection should receive "
+            "adjuvant nivolumab for one year (CheckMate 577).",
+            "If margins are positive (R1/R2), options include additional "
+            "chemoradiation if not previously delivered or palliative "
+            "systemic therapy, depending on prior treatment.",
+        ),
+    ),
+    # Unresectable or medically inoperable (non-metastatic)
+    _Rule(
+        lambda c: not _operable(c) and c.cervical,
+        "Definitive chemoradiation (cervical esophagus)",
+        (
+            "For cervical esophageal tumours, definitive chemoradiation "
+            "is preferred over esophagectomy.",
+        ),
+    ),
+    _Rule(
+        lambda c: not _operable(c) and not c.cervical and c.t4b_invasion,
+        "Definitive chemoradiation (T4b/unresectable)",
+        (
+            "Because the tumour is T4b/unresectable by local invasion, "
+            "definitive chemoradiation is recommended.",
+        ),
+    ),
+    _Rule(
+        lambda c: (
+            c.high_risk_surgery and not c.unresectable
+            and not c.cervical and not c.t4b_invasion
+        ),
+        "Definitive chemoradiation (medically inoperable)",
+        (
+            "Although anatomically resectable, the patient is not a "
+            "suitable surgical candidate; definitive chemoradiation is "
+            "recommended.",
+        ),
+    ),
+)
+
+
+def _locoregional_key(c: _Context) -> int:
+    """Pack the decision-relevant facts of ``c`` into a small integer."""
+    return (
+        c.t_class
+        | c.n0 << 2
+        | c.unresectable << 3
+        | c.high_risk_surgery << 4
+        | c.cervical << 5
+        | c.t4b_invasion << 6
+        | c.low_risk << 7
+        | c.gej_adeno << 8
+    )
+
+
+def _compile_locoregional_rules() -> Dict[int, Tuple[Tuple[str, ...], str]]:
+    # Walk the rule table once for every combination of packed facts and keep
+    # the outcome: the deduplicated summaries and one newline-joined details
+    # template.  Only the per-patient text (stage, T, histology) is left to
+    # fill in at lookup time.
+    table = {}
+    for t_class in TClass:
+        for flags in product((False, True), repeat=7):
+            c = _Context("", t_class, "", "", *flags)
+            summaries: List[str] = []
+            lines: List[str] = []
+            for rule in _LOCOREGIONAL_RULES:
+                if rule.cond(c):
+                    lines.extend(rule.details)
+                    if rule.summary and rule.summary not in summaries:
+                        summaries.append(rule.summary)
+            key = _locoregional_key(c)
+            assert key & 3 == t_class
+            table[key] = (tuple(summaries), "\n".join(lines))
+    return table
+
+
+_LOCOREGIONAL_TABLE = _compile_locoregional_rules()
 
 
 # -------------------------------------------------------------------
 # Main algorithm
 # -------------------------------------------------------------------
 
-def recommend_plan(patient: Dict) -> Dict[str, str]:
+def recommend_plan(patient: Dict) -> Mapping[str, str]:
     """Generate a treatment plan for esophageal cancer.
 
     Parameters
@@ -91,7 +640,8 @@ def recommend_plan(patient: Dict) -> Dict[str, str]:
         Expected keys (from the web form):
         - age, stage, histology
         - tumour_size_cm, grade, lymphovascular_invasion
-        - biomarkers (dict with HER2, PD_L1_CPS, MSI, CLDN18.2)
+        - biomarkers (dict with HER2, PD_L1_CPS, MSI, CLDN18_2; lower-case
+          keys and 'CLDN18.2' are also accepted)
         - comorbidities (list of coded strings, e.g. 'severe_pulm', 'frailty')
         - comorbidities_other (optional free text)
         - tumour_location (e.g. 'cervical', 'distal_thoracic', 'gej_siewert2')
@@ -103,64 +653,170 @@ def recommend_plan(patient: Dict) -> Dict[str, str]:
 
     Returns
     -------
-    dict with keys 'summary' and 'details'
+    read-only mapping with keys 'summary' and 'details'.  The same object
+    is handed to every caller with equivalent inputs; use ``dict(...)``
+    for a mutable copy.
+
+    Results are memoized on the decision-relevant fields only, so
+    resubmitting an identical form (or one differing only in fields the
+    rules ignore) returns without re-running the rule cascade.
+    """
+
+    return _recommend_plan_cached(_cache_key(patient))
+
+
+# Invasion codes that can change the output; the others (e.g. diaphragm
+# involvement) are dropped from the cache key, as are comorbidities outside
+# _HIGH_RISK_COMORB
+_KEYED_INVASION: FrozenSet[str] = _T4B_LIKE | _MET_INVASION
+
+
+def _cache_key(patient: Dict) -> Tuple:
+    """Canonical hashable key for the fields that drive the recommendation.
+
+    Fields the rules never read (age, nodal regions, free text, biomarkers
+    other than the four canonical ones) are left out, and coded lists are
+    reduced to a bitmask of the codes the rules test, so patients that can
+    only get the same answer share a cache entry.  Biomarkers are keyed by canonical
+    name, so "CLDN18.2" and "CLDN18_2" spellings share an entry too.
+    Distant metastatic sites stay a tuple because their order shows up in
+    the rationale text.  This is the only place patient input is
+    normalized; :meth:`PatientData.from_key` takes the result as-is.
+    """
+    biomarkers = _canonical_biomarkers(patient.get("biomarkers"))
+    return (
+        patient.get("stage", ""),
+        patient.get("histology", ""),
+        patient.get("tumour_size_cm"),
+        patient.get("grade"),
+        bool(patient.get("lymphovascular_invasion")),
+        tuple(map(biomarkers.get, _BIOMARKER_FIELDS)),
+        _flag_mask(_HIGH_RISK_COMORB.intersection(map(str.lower, patient.get("comorbidities") or ()))),
+        (patient.get("tumour_location") or "").lower(),
+        _flag_mask(_KEYED_INVASION.intersection(map(str.lower, patient.get("invasion_features") or ()))),
+        tuple(map(str.lower, patient.get("distant_met_sites") or ())),
+        bool(patient.get("surgical_candidate", True)),
+    )
+
+
+def _plan_for_key(key: Tuple) -> Tuple[str, Union[str, "_LazyDetails"]]:
+    """Evaluate a :func:`_cache_key` tuple; returns (summary, details)."""
+    return _build_plan(PatientData.from_key(key))
+
+
+class _LazyDetails:
+    """Rationale text whose systemic-therapy line is built on first use.
+
+    The metastatic branch knows its earlier rationale lines up front; the
+    biomarker-driven options line is only assembled when the details are
+    read.  Pickles as the finished string.  Instances are shared between
+    threads through the plan cache, so nothing is cleared once built: two
+    concurrent first reads each build the same text and one of them wins.
+    """
+
+    __slots__ = ("_head", "_pdata", "_text")
+
+    def __init__(self, head: str, pdata: PatientData) -> None:
+        self._head = head
+        self._pdata = pdata
+        self._text: Optional[str] = None
+
+    def __str__(self) -> str:
+        text = self._text
+        if text is None:
+            tail = _metastatic_details(self._pdata)
+            text = self._text = self._head + "\n" + tail if self._head else tail
+        return text
+
+    def __reduce__(self):
+        return (str, (str(self),))
+
+
+class _PlanResult(collections.abc.Mapping):
+    """Read-only ``{'summary', 'details'}`` mapping returned to callers.
+
+    ``details`` may start out as a :class:`_LazyDetails` and is resolved
+    to a plain string on first access.
+    """
+
+    __slots__ = ("_summary", "_details")
+
+    def __init__(self, summary: str, details: Union[str, _LazyDetails]) -> None:
+        self._summary = summary
+        self._details = details
+
+    def __getitem__(self, key: str) -> str:
+        if key == "summary":
+            return self._summary
+        if key == "details":
+            details = self._details
+            if not isinstance(details, str):
+                # Concurrent first reads may both resolve it; the strings are
+                # equal and the lazy object (and its PatientData) is then
+                # dropped
+                details = self._details = str(details)
+            return details
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(("summary", "details"))
+
+    def __len__(self) -> int:
+        return 2
+
+    def __repr__(self) -> str:
+        return repr(dict(self))
+
+
+@lru_cache(maxsize=4096)
+def _recommend_plan_cached(key: Tuple) -> Mapping[str, str]:
+    """Memoized core of :func:`recommend_plan`.
+
+    Batch evaluation calls _plan_for_key directly so a large cohort does
+    not evict the web app's working set.
     """
+    return _PlanResult(*_plan_for_key(key))
 
-    # Convert dictionary into PatientData for the fields it knows about
-    pdata = PatientData(
-        age=patient.get("age"),
-        stage=patient.get("stage", ""),
-        histology=patient.get("histology", ""),
-        tumour_size_cm=patient.get("tumour_size_cm"),
-        grade=patient.get("grade"),
-        lymphovascular_invasion=patient.get("lymphovascular_invasion"),
-        biomarkers=patient.get("biomarkers", {}),
-        comorbidities=patient.get("comorbidities", []),
-        imaging_findings=patient.get("imaging_findings", ""),
+
+def _metastatic_details(pdata: PatientData) -> str:
+    """Rationale line for first-line systemic therapy in metastatic disease."""
+    return (
+        "For metastatic disease, first-line systemic therapy is chosen "
+        "based on histology and biomarkers. Options include: "
+        + "; ".join(systemic_therapy_options(pdata))
+        + ". Subsequent lines may incorporate agents such as ramucirumab + paclitaxel, "
+          "irinotecan, or additional immunotherapy depending on prior exposure and tolerance."
     )
 
-    tumour_location = (patient.get("tumour_location") or "").lower()
-    invasion_features = [f.lower() for f in patient.get("invasion_features", [])]
-    nodal_regions = [n.lower() for n in patient.get("nodal_regions", [])]
-    distant_met_sites = [m.lower() for m in patient.get("distant_met_sites", [])]
-    surgical_candidate = bool(patient.get("surgical_candidate", True))
 
-    T_category, N_category, M_category = parse_stage(pdata.stage)
-    T_upper = T_category.upper()
-    N_upper = N_category.upper()
-    M_upper = M_category.upper()
+def _build_plan(pdata: PatientData) -> Tuple[str, Union[str, _LazyDetails]]:
+    """Run the decision cascade on normalized patient data."""
+
+    surgical_candidate = pdata.surgical_candidate
+
+    T_upper = pdata.T
+    N_upper = pdata.N
+    M_upper = pdata.M
+
+    details = io.StringIO()
 
-    details: List[str] = []
-    summary_parts: List[str] = []
+    def add_detail(text: str) -> None:
+        # Rationale lines go straight into one buffer, newline-separated
+        if details.tell():
+            details.write("\n")
+        details.write(text)
 
     # --- 1. Determine metastatic vs local/regional ---
-    # If imaging shows metastatic sites, treat as metastatic regardless of M in TNM.
-    # Determine if there are distant metastases either via coded distant_met_sites or
-    # through invasion features that represent carcinomatosis/implants.  NCCN defines
-    # pleural or peritoneal implants as distant metastases rather than local invasion
-    # (eg, pleural carcinomatosis corresponds to M1 disease【944136750254746†L3550-L3577】).
-    has_imaging_metastasis = False
-    # copy of distant sites for reporting
-    distant_sites_report: List[str] = []
-    if distant_met_sites:
-        has_imaging_metastasis = True
-        distant_sites_report.extend(distant_met_sites)
-    # treat pleural or peritoneal carcinomatosis as metastatic disease
-    for f in invasion_features:
-        if f in {"pleural_carcinomatosis", "peritoneal_carcinomatosis"}:
-            has_imaging_metastasis = True
-            # record as pleural/peritoneal metastasis for details
-            if f == "pleural_carcinomatosis" and "pleura" not in distant_sites_report:
-                distant_sites_report.append("pleura")
-            if f == "peritoneal_carcinomatosis" and "peritoneal" not in distant_sites_report:
-                distant_sites_report.append("peritoneal")
-    if has_imaging_metastasis and (not M_upper or M_upper == "M0"):
-        details.append(
+    # If imaging shows metastatic sites (including carcinomatosis, see
+    # PatientData.imaging_met_sites), treat as metastatic regardless of M in TNM.
+    if pdata.imaging_met_sites and (not M_upper or M_upper == "M0"):
+        add_detail(
             "Imaging demonstrates distant metastatic disease ({}), "
             "so the disease is functionally metastatic even if TNM lists M0."
-            .format(", ".join(distant_sites_report))
+            .format(", ".join(pdata.imaging_met_sites))
         )
         M_upper = "M1"
+    metastatic = pdata.is_metastatic
 
     # --- 2. Determine unresectability / T4b based on invasion + TNM ---
     unresectable = False
@@ -168,25 +824,16 @@ def recommend_plan(patient: Dict) -> Dict[str, str]:
     # T4b by TNM string
     if "4B" in T_upper:
         unresectable = True
-        details.append(
+        add_detail(
             "Tumour is staged as T4b by TNM, generally unresectable and "
             "treated with definitive chemoradiation or systemic therapy."
         )
 
     # T4b-equivalent invasion patterns (airway, aorta, vertebral body, etc.)
-    # Features that correspond to T4b (unresectable) disease.  NCCN defines
-    # invasion of the trachea/airway, aorta, or vertebral body as T4b.  
-    # Pericardial involvement is classified as T4a and is potentially
-    # resectable; pleural or peritoneal carcinomatosis are distant
-    # metastases (M1) rather than local invasion【944136750254746†L3550-L3577】.  
-    t4b_like_flags = {
-        "airway_invasion",
-        "aortic_encasement",
-        "vertebral_body_involvement",
-    }
-    if any(f in t4b_like_flags for f in invasion_features):
+    t4b_invasion = bool(pdata.invasion_mask & _T4B_MASK)
+    if t4b_invasion:
         if not unresectable:
-            details.append(
+            add_detail(
                 "Imaging shows invasion of critical adjacent structures "
                 "(e.g., airway, aorta, vertebral body, pericardium, pleura), "
                 "which is consistent with T4b and renders the tumour "
@@ -196,18 +843,18 @@ def recommend_plan(patient: Dict) -> Dict[str, str]:
         unresectable = True
 
     # Cervical location: NCCN favors definitive chemoradiation
-    cervical_location = tumour_location == "cervical"
-    if cervical_location and not unresectable and M_upper in ("", "M0"):
-        details.append(
+    cervical_location = pdata.loc == Location.CERVICAL
+    if cervical_location and not unresectable and not metastatic:
+        add_detail(
             "Primary tumour is in the cervical esophagus, where NCCN "
             "recommends definitive chemoradiation rather than esophagectomy."
         )
         unresectable = True  # functionally treat as non-surgical
 
     # Metastatic disease is 'unresectable' from a curative esophagectomy standpoint
-    if M_upper and M_upper != "M0":
+    if metastatic:
         unresectable = True
-        details.append(
+        add_detail(
             "Because the disease is metastatic ({}), curative esophagectomy "
             "is not appropriate; management is systemic/palliative."
             .format(M_upper)
@@ -217,12 +864,9 @@ def recommend_plan(patient: Dict) -> Dict[str, str]:
     high_risk_surgery = False
 
     # Structured comorbidities from the web form
-    comorbid_codes = set(c.lower() for c in pdata.comorbidities)
-    if any(code in comorbid_codes for code in {
-        "severe_pulm", "severe_card", "frailty", "ckd", "liver"
-    }):
+    if pdata.comorbidity_mask & _HIGH_RISK_MASK:
         high_risk_surgery = True
-        details.append(
+        add_detail(
             "Significant comorbidities (e.g., severe cardiopulmonary disease, "
             "frailty, CKD, or liver disease) increase operative risk and may "
             "limit tolerance of esophagectomy."
@@ -231,201 +875,76 @@ def recommend_plan(patient: Dict) -> Dict[str, str]:
     # Explicit "not a surgical candidate" flag from the form
     if not surgical_candidate:
         high_risk_surgery = True
-        details.append(
+        add_detail(
             "The patient has been assessed as not a surgical candidate; "
             "definitive chemoradiation or systemic therapy is preferred "
             "over esophagectomy."
         )
 
-    # --- 4. Early disease: Tis/T1a ---
-    if not unresectable and not high_risk_surgery:
-        if T_upper in {"TIS", "T1A"}:
-            details.append(
-                f"Stage {T_upper} disease is confined to the mucosa. "
-                "Endoscopic therapy (EMR/ESD) is preferred for high-grade "
-                "dysplasia and T1a lesions when the lesion is small and "
-                "without high-risk features."
-            )
-            summary_parts.append("Endoscopic resection (EMR/ESD)")
-            details.append(
-                "If the lesion is extensive or not amenable to endoscopic "
-                "removal, esophagectomy is recommended."
-            )
-
-    # --- 5. T1b or T2 N0: surgery vs neoadjuvant ---
-    if (
-        not unresectable
-        and not high_risk_surgery
-        and T_upper in {"T1B", "T2"}
-        and (not N_upper or N_upper == "N0")
-    ):
-        low_risk = True
-        # High-risk features prompting neoadjuvant therapy
-        if pdata.tumour_size_cm and pdata.tumour_size_cm >= 3:
-            low_risk = False
-        if pdata.grade and pdata.grade.lower().startswith("poor"):
-            low_risk = False
-        if pdata.lymphovascular_invasion:
-            low_risk = False
-
-        if low_risk:
-            details.append(
-                f"For a small (<3 cm), well-differentiated {pdata.histology} "
-                "tumour without lymphovascular invasion (pT1b–pT2,N0), "
-                "esophagectomy alone is an NCCN-accepted option."
-            )
-            summary_parts.append("Primary esophagectomy")
-        else:
-            details.append(
-                "Because the tumour has high-risk features (size ≥3 cm, "
-                "poor differentiation and/or lymphovascular invasion), "
-                "neoadjuvant chemoradiation followed by esophagectomy is "
-                "preferred."
-            )
-            summary_parts.append("Neoadjuvant chemoradiation → esophagectomy")
-
-    # --- 6. Locally advanced resectable disease (T3/T4a or N+) ---
-    if (
-        not unresectable
-        and not high_risk_surgery
-        and (
-            "T3" in T_upper
-            or "T4A" in T_upper
-            or (N_upper and N_upper != "N0")
-        )
-    ):
-        # Locally advanced resectable disease
-        details.append(
-            f"Locally advanced stage {pdata.stage} is typically managed with "
-            "neoadjuvant therapy followed by esophagectomy. Approaches "
-            "include chemoradiation (CROSS-type) or peri-operative "
-            "chemotherapy (e.g., FLOT) depending on histology and location."
-        )
-        # For GEJ Siewert II/III adenocarcinoma, peri-operative chemotherapy (FLOT) is preferred
-        if tumour_location.startswith("gej_siewert") and pdata.histology.lower() == "adenocarcinoma":
-            summary_parts.append("Peri-operative chemotherapy (FLOT) → esophagectomy")
-        else:
-            summary_parts.append("Neoadjuvant chemoradiation → esophagectomy")
-
-    # --- 7. Adjuvant therapy after resection (conceptual guidance text) ---
-    if (
-        not unresectable
-        and not high_risk_surgery
-        and any("esophagectomy" in part.lower() for part in summary_parts)
-    ):
-        details.append(
-            "After surgery, pathologic staging determines the need for "
-            "adjuvant therapy. Residual disease (ypT+ and/or ypN+) after "
-            "neoadjuvant chemoradiation and R0 resection should receive "
-            "adjuvant nivolumab for one year (CheckMate 577)."
-        )
-        details.append(
-            "If margins are positive (R1/R2), options include additional "
-            "chemoradiation if not previously delivered or palliative "
-            "systemic therapy, depending on prior treatment."
-        )
-
-    # --- 8. Unresectable or medically inoperable (non-metastatic) ---
-    if (unresectable or high_risk_surgery) and M_upper in ("", "M0"):
-        if cervical_location:
-            summary_parts.append("Definitive chemoradiation (cervical esophagus)")
-            details.append(
-                "For cervical esophageal tumours, definitive chemoradiation "
-                "is preferred over esophagectomy."
-            )
-        elif any(f in t4b_like_flags for f in invasion_features):
-            summary_parts.append("Definitive chemoradiation (T4b/unresectable)")
-            details.append(
-                "Because the tumour is T4b/unresectable by local invasion, "
-                "definitive chemoradiation is recommended."
-            )
-        elif high_risk_surgery and not unresectable:
-            summary_parts.append("Definitive chemoradiation (medically inoperable)")
-            details.append(
-                "Although anatomically resectable, the patient is not a "
-                "suitable surgical candidate; definitive chemoradiation is "
-                "recommended."
-            )
-
-    # --- 9. Metastatic disease: systemic therapy based on biomarkers ---
-    if M_upper and M_upper != "M0":
-        """
-        Construct systemic therapy recommendations for metastatic disease.  
-        Priority is given to MSI-H/dMMR monotherapy, followed by HER2-targeted
-        therapy, CLDN18.2-targeted therapy (when HER2 is negative), and
-        immunotherapy combinations based on PD-L1 expression and histology.
-        """
-        systemic_options: List[str] = []
-        bmk = {k.upper(): v for k, v in pdata.biomarkers.items()}
-        hist = pdata.histology.lower()
-        pd_l1 = bmk.get("PD_L1_CPS")
-
-        # MSI-H/dMMR tumours: ICI monotherapy has regulatory approval and
-        # supersedes other biomarker-directed therapies in first line
-        if bmk.get("MSI"):
-            systemic_options.append(
-                "immune checkpoint inhibitor monotherapy (e.g., pembrolizumab "
-                "or dostarlimab) for MSI-H/dMMR disease"
-            )
-        else:
-            # HER2-positive disease: standard is fluoropyrimidine + platinum + trastuzumab
-            if bmk.get("HER2"):
-                option = "fluoropyrimidine + platinum chemotherapy + trastuzumab"
-                # if PD-L1 CPS ≥5 in adenocarcinoma, immunotherapy may be added
-                if pd_l1 is not None and hist == "adenocarcinoma" and pd_l1 >= 5:
-                    option += " ± nivolumab or pembrolizumab"
-                systemic_options.append(option)
-            # CLDN18.2-positive disease only if HER2-negative
-            if bmk.get("CLDN18.2") and not bmk.get("HER2"):
-                systemic_options.append(
-                    "FOLFOX or CAPOX + zolbetuximab for CLDN18.2-positive disease"
-                )
-            # PD-L1 driven therapy for squamous carcinoma (CheckMate 648)
-            if hist == "squamous" and pd_l1 is not None:
-                if pd_l1 >= 10:
-                    systemic_options.append(
-                        "platinum-based chemotherapy + nivolumab, or "
-                        "nivolumab/ipilimumab in selected patients"
-                    )
-                else:
-                    systemic_options.append(
-                        "platinum-based chemotherapy ± nivolumab, depending on PD-L1 expression and prior therapy"
-                    )
-            # PD-L1 driven therapy for adenocarcinoma/GEJ (CheckMate 649 / KEYNOTE‑590).
-            # Only consider this pathway if the tumour is not HER2-positive or CLDN18.2-positive,
-            # because targeted agents take precedence.  When HER2-positive and PD-L1 ≥5, the
-            # addition of nivolumab/pembrolizumab is already handled above with trastuzumab.
-            if hist == "adenocarcinoma" and pd_l1 is not None and not bmk.get("HER2") and not bmk.get("CLDN18.2"):
-                if pd_l1 >= 5:
-                    systemic_options.append(
-                        "fluoropyrimidine + platinum chemotherapy + nivolumab or pembrolizumab"
-                    )
-                else:
-                    systemic_options.append(
-                        "fluoropyrimidine + platinum chemotherapy with optional immunotherapy depending on local practice"
-                    )
-            # If no biomarker-driven options were generated, use standard chemo ± immunotherapy
-            if not systemic_options:
-                systemic_options.append(
-                    "fluoropyrimidine + platinum chemotherapy (e.g., FOLFOX or CAPOX) with or without immunotherapy based on PD-L1 and histology"
-                )
-
-        details.append(
-            "For metastatic disease, first-line systemic therapy is chosen "
-            "based on histology and biomarkers. Options include: "
-            + "; ".join(systemic_options)
-            + ". Subsequent lines may incorporate agents such as ramucirumab + paclitaxel, "
-              "irinotecan, or additional immunotherapy depending on prior exposure and tolerance."
-        )
-        summary_parts.append("Systemic therapy")
+    # --- 4. Metastatic disease: systemic therapy based on biomarkers ---
+    # The local/regional rules below never fire for M1, so skip them.
+    if metastatic:
+        return "Systemic therapy", _LazyDetails(details.getvalue(), pdata)
+
+    # --- 5-9. Local/regional disease: look up the compiled rule table ---
+    ctx = _Context(
+        t=T_upper,
+        t_class=pdata.t_class,
+        stage=pdata.stage,
+        histology=pdata.histology,
+        n0=not N_upper or N_upper == "N0",
+        unresectable=unresectable,
+        high_risk_surgery=high_risk_surgery,
+        cervical=cervical_location,
+        t4b_invasion=t4b_invasion,
+        low_risk=_is_low_risk(pdata),
+        gej_adeno=pdata.loc in _GEJ_LOCATIONS and pdata.hist == Histology.ADENOCARCINOMA,
+    )
+    summaries, template = _LOCOREGIONAL_TABLE[_locoregional_key(ctx)]
+    if template:
+        add_detail(template.format(c=ctx))
 
-    # --- 10. Consolidate summary ---
-    # Remove duplicates while preserving order
-    summary = "; ".join(dict.fromkeys(summary_parts))
+    # --- 10. Consolidate summary (table entries are already deduplicated) ---
+    summary = "; ".join(summaries)
     if not summary:
         summary = (
             "No specific recommendation generated; please review clinical "
             "details and consult full NCCN guidelines and MDT discussion."
         )
 
-    return {"summary": summary, "details": "\n".join(details)}
+    return summary, details.getvalue()
+
+
+# -------------------------------------------------------------------
+# Batch evaluation
+# -------------------------------------------------------------------
+
+# Below this many distinct decision keys, process start-up and pickling
+# cost more than the rule cascade itself (microseconds per key), so the
+# batch is evaluated in-process.
+_PARALLEL_MIN_KEYS = 10000
+
+
+def batch_recommend(patients: List[Dict], max_workers: Optional[int] = None) -> List[Mapping[str, str]]:
+    """Run :func:`recommend_plan` over a cohort, in parallel when it pays off.
+
+    Patients are first grouped by their decision key, so each distinct
+    combination is evaluated once however often it repeats in the cohort.
+    Results are returned in input order, as read-only mappings shared by
+    patients with the same key.  ``max_workers`` defaults to the number of
+    CPUs.
+    """
+    keys = [_cache_key(p) for p in patients]
+    unique = list(dict.fromkeys(keys))
+    workers = max_workers or os.cpu_count() or 1
+    if workers < 2 or len(unique) < _PARALLEL_MIN_KEYS:
+        plans = list(map(_plan_for_key, unique))
+    else:
+        # About four chunks per worker balances load against IPC overhead.
+        # Workers import this module, which builds the stage and rule
+        # tables, so only the key tuples and result tuples are pickled.
+        chunksize = max(1, len(unique) // (4 * workers))
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            plans = list(ex.map(_plan_for_key, unique, chunksize=chunksize))
+    by_key = {k: _PlanResult(*plan) for k, plan in zip(unique, plans)}
+    return [by_key[k] for k in keys]
@@ -0,0 +1,22 @@
+"""
+Gunicorn settings for serving the treatment planning app in production.
+
+Usage:
+
+    gunicorn app:app
+
+Gunicorn picks this file up automatically from the working directory.
+Each worker process holds its own copy of the rule engine; the threaded
+worker class lets a worker overlap slow clients while requests stay
+CPU-light.  Override any value with the matching ``GUNICORN_*``
+environment variable or on the command line.
+"""
+
+import multiprocessing
+import os
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:{}".format(os.environ.get("PORT", "5000")))
+workers = int(os.environ.get("GUNICORN_WORKERS", multiprocessing.cpu_count()))
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", 4))
+keepalive = int(os.environ.get("GUNICORN_KEEPALIVE", 5))